@@ -1,18 +1,16 @@
 """
 Compare different summarization approaches
 """
-import json
+import importlib.util
 from pathlib import Path
 
-try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich import box
-    HAS_RICH = True
-    console = Console()
-except ImportError:
-    HAS_RICH = False
+from jsonl_io import decode_sample, iter_jsonl
+
+# rich is optional and slow to import, so only check here that it is installed
+HAS_RICH = importlib.util.find_spec('rich') is not None
+
+# Punctuation ignored when matching impression words against findings
+_STRIP_PUNCT = str.maketrans('', '', '.,;:')
 
 
 def compare_summaries():
@@ -21,10 +19,21 @@ def compare_summaries():
     
     # Load radiology data
     test_file = data_dir / "opi" / "test.jsonl"
-    with open(test_file, 'r', encoding='utf-8') as f:
-        samples = [json.loads(line) for line in f]
+    samples = iter_jsonl(test_file, decode_sample)
     
-    if HAS_RICH:
+    use_rich = HAS_RICH
+    if use_rich:
+        # rich may be installed but fail to import; fall back to plain output
+        try:
+            from rich import box
+            from rich.console import Console
+            from rich.panel import Panel
+            from rich.table import Table
+        except ImportError:
+            use_rich = False
+    
+    if use_rich:
+        console = Console()
         console.clear()
         console.print(Panel.fit(
             "[bold cyan]Clinical Text Summarization - Comparison View[/bold cyan]",
@@ -36,24 +45,37 @@ def compare_summaries():
         print("Clinical Text Summarization - Comparison View")
         print("="*80 + "\n")
     
-    # Show 5 examples with detailed comparison
-    for i, sample in enumerate(samples[:5], 1):
-        findings = sample.get('inputs', '')
-        impression = sample.get('target', '')
+    num_samples = 0
+    total_finding_words = 0
+    total_impression_words = 0
+    
+    # Single pass: accumulate statistics for every report, show 5 in detail
+    for i, sample in enumerate(samples, 1):
+        findings = sample.inputs
+        impression = sample.target
         
         # Calculate metrics
         finding_words = findings.split()
         impression_words = impression.split()
+        
+        num_samples += 1
+        total_finding_words += len(finding_words)
+        total_impression_words += len(impression_words)
+        
+        if i > 5:
+            continue
+        
         compression = len(finding_words) / max(len(impression_words), 1)
         
-        # Extract key terms
+        # Extract key terms (impression words that also appear as a findings word)
+        finding_tokens = set(findings.lower().translate(_STRIP_PUNCT).split())
         key_terms = []
         for word in impression_words:
-            word_clean = word.lower().strip('.,;:')
-            if word_clean in findings.lower() and len(word_clean) > 3:
+            word_clean = word.lower().translate(_STRIP_PUNCT)
+            if len(word_clean) > 3 and word_clean in finding_tokens:
                 key_terms.append(word)
         
-        if HAS_RICH:
+        if use_rich:
             console.print(f"[bold yellow]Report #{i}[/bold yellow]")
             console.print()
             
@@ -89,17 +111,15 @@ def compare_summaries():
             print()
     
     # Summary statistics
-    total_finding_words = sum(len(s.get('inputs', '').split()) for s in samples)
-    total_impression_words = sum(len(s.get('target', '').split()) for s in samples)
     avg_compression = total_finding_words / total_impression_words
     
-    if HAS_RICH:
+    if use_rich:
         console.print(Panel(
             f"[bold]Dataset Summary[/bold]\n\n"
-            f"Total reports: {len(samples)}\n"
+            f"Total reports: {num_samples}\n"
             f"Average compression: {avg_compression:.1f}x\n"
-            f"Average finding: {total_finding_words/len(samples):.1f} words\n"
-            f"Average impression: {total_impression_words/len(samples):.1f} words",
+            f"Average finding: {total_finding_words/num_samples:.1f} words\n"
+            f"Average impression: {total_impression_words/num_samples:.1f} words",
             title="Overall Statistics",
             border_style="green"
         ))
@@ -107,10 +127,10 @@ def compare_summaries():
         print("="*80)
         print("OVERALL STATISTICS")
         print("="*80)
-        print(f"Total reports: {len(samples)}")
+        print(f"Total reports: {num_samples}")
         print(f"Average compression: {avg_compression:.1f}x")
-        print(f"Average finding: {total_finding_words/len(samples):.1f} words")
-        print(f"Average impression: {total_impression_words/len(samples):.1f} words")
+        print(f"Average finding: {total_finding_words/num_samples:.1f} words")
+        print(f"Average impression: {total_impression_words/num_samples:.1f} words")
         print()
 
 
@@ -2,150 +2,202 @@
 Interactive Dashboard for Clinical Text Summarization
 Shows beautiful visualizations, metrics, and patient report analysis
 """
-import json
+import functools
+import importlib.util
 import os
 from pathlib import Path
 from collections import Counter
+from itertools import chain, islice
 import re
 
-# Try to import rich for beautiful output
-try:
+from jsonl_io import decode_sample, iter_jsonl
+
+# Use rich for beautiful output if installed; it is only imported once needed
+HAS_RICH = importlib.util.find_spec('rich') is not None
+
+
+@functools.lru_cache(maxsize=None)
+def get_console():
+    """Return the shared rich Console"""
     from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.layout import Layout
-    from rich.progress import Progress
-    from rich import box
-    from rich.text import Text
-    HAS_RICH = True
+    return Console()
+
+
+# Aho-Corasick automaton for matching all medical terms in one pass
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
 except ImportError:
-    HAS_RICH = False
+    HAS_AHOCORASICK = False
+
+# Common medical findings
+_CONDITIONS = (
+    'pneumonia', 'edema', 'effusion', 'consolidation', 'atelectasis',
+    'cardiomegaly', 'pneumothorax', 'nodule', 'mass', 'fracture',
+    'infiltrate', 'opacity', 'calcification', 'granuloma', 'emphysema',
+    'hypertension', 'diabetes', 'asthma', 'copd', 'cancer'
+)
+
+# Anatomy terms
+_ANATOMY = (
+    'heart', 'lung', 'chest', 'cardiac', 'pulmonary', 'mediastinal',
+    'pleural', 'thorax', 'right', 'left', 'upper', 'lower', 'lobe'
+)
+
+# Status terms
+_STATUS = ('normal', 'abnormal', 'acute', 'chronic', 'stable', 'improved',
+           'worsened', 'negative', 'positive', 'clear', 'unremarkable')
+
+_TERM_CATEGORIES = (
+    ('conditions', _CONDITIONS),
+    ('anatomy', _ANATOMY),
+    ('status', _STATUS),
+)
+
+
+def _build_term_automaton():
+    """Build the automaton once so every document is scanned in a single pass"""
+    automaton = ahocorasick.Automaton()
+    for _, terms in _TERM_CATEGORIES:
+        for term in terms:
+            automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+
+_TERM_AUTOMATON = _build_term_automaton() if HAS_AHOCORASICK else None
+
+# Impressions reporting a normal study
+_NORMAL_RE = re.compile(r'\b(?:no acute|normal|negative)\b', re.IGNORECASE)
 
-console = Console() if HAS_RICH else None
+# Health question topics, one named group per topic
+_TOPIC_RE = re.compile(
+    r'(?P<Medication>medication|drug|pill|prescription)'
+    r'|(?P<Pain>pain|hurt|ache)'
+    r'|(?P<Treatment>treatment|therapy|cure)'
+    r'|(?P<SideEffects>side effect|adverse|reaction)'
+    r'|(?P<Diagnosis>test|diagnosis|screen)',
+    re.IGNORECASE
+)
+
+_TOPIC_LABELS = (
+    ('Medication', 'Medication'),
+    ('Pain', 'Pain'),
+    ('Treatment', 'Treatment'),
+    ('SideEffects', 'Side Effects'),
+    ('Diagnosis', 'Diagnosis'),
+)
+
+
+def load_samples(test_file, num_preview):
+    """Return the first few samples for display and a stream over all of them"""
+    samples = iter_jsonl(test_file, decode_sample)
+    preview = list(islice(samples, num_preview))
+    return preview, chain(preview, samples)
 
 
 def extract_medical_terms(text):
     """Extract key medical terms from text"""
-    # Common medical findings
-    conditions = [
-        'pneumonia', 'edema', 'effusion', 'consolidation', 'atelectasis',
-        'cardiomegaly', 'pneumothorax', 'nodule', 'mass', 'fracture',
-        'infiltrate', 'opacity', 'calcification', 'granuloma', 'emphysema',
-        'hypertension', 'diabetes', 'asthma', 'copd', 'cancer'
-    ]
-    
-    # Anatomy terms
-    anatomy = [
-        'heart', 'lung', 'chest', 'cardiac', 'pulmonary', 'mediastinal',
-        'pleural', 'thorax', 'right', 'left', 'upper', 'lower', 'lobe'
-    ]
+    text_lower = text.lower()
     
-    # Status terms
-    status = ['normal', 'abnormal', 'acute', 'chronic', 'stable', 'improved', 
-              'worsened', 'negative', 'positive', 'clear', 'unremarkable']
+    if not HAS_AHOCORASICK:
+        return {category: [t for t in terms if t in text_lower]
+                for category, terms in _TERM_CATEGORIES}
     
-    text_lower = text.lower()
+    # Single pass over the text, then report hits in vocabulary order
+    hits = {term for _, term in _TERM_AUTOMATON.iter(text_lower)}
     
-    found = {
-        'conditions': [c for c in conditions if c in text_lower],
-        'anatomy': [a for a in anatomy if a in text_lower],
-        'status': [s for s in status if s in text_lower]
-    }
+    found = {category: [t for t in terms if t in hits]
+             for category, terms in _TERM_CATEGORIES}
     
     return found
 
 
 def analyze_radiology_reports(samples):
     """Analyze radiology reports for insights"""
-    all_findings = []
-    all_impressions = []
-    all_conditions = []
-    all_anatomy = []
-    all_status = []
+    total = 0
+    normal_count = 0
+    finding_words = 0
+    impression_words = 0
+    condition_counts = Counter()
+    anatomy_counts = Counter()
+    status_counts = Counter()
     
+    # Single pass: only running totals are kept, never the reports themselves
     for sample in samples:
-        findings = sample.get('inputs', '')
-        impression = sample.get('target', '')
+        findings = sample.inputs
+        impression = sample.target
         
-        all_findings.append(findings)
-        all_impressions.append(impression)
+        total += 1
+        finding_words += len(findings.split())
+        impression_words += len(impression.split())
         
         # Extract medical terms
         terms = extract_medical_terms(findings + ' ' + impression)
-        all_conditions.extend(terms['conditions'])
-        all_anatomy.extend(terms['anatomy'])
-        all_status.extend(terms['status'])
-    
-    # Count frequencies
-    condition_freq = Counter(all_conditions).most_common(10)
-    anatomy_freq = Counter(all_anatomy).most_common(10)
-    status_freq = Counter(all_status).most_common(5)
-    
-    # Check for normal vs abnormal
-    normal_count = sum(1 for imp in all_impressions if 'no acute' in imp.lower() or 'normal' in imp.lower() or 'negative' in imp.lower())
-    abnormal_count = len(all_impressions) - normal_count
+        condition_counts.update(terms['conditions'])
+        anatomy_counts.update(terms['anatomy'])
+        status_counts.update(terms['status'])
+        
+        # Check for normal vs abnormal
+        if _NORMAL_RE.search(impression):
+            normal_count += 1
     
     return {
-        'total': len(samples),
+        'total': total,
         'normal': normal_count,
-        'abnormal': abnormal_count,
-        'conditions': condition_freq,
-        'anatomy': anatomy_freq,
-        'status': status_freq,
-        'avg_finding_len': sum(len(f.split()) for f in all_findings) / len(all_findings),
-        'avg_impression_len': sum(len(i.split()) for i in all_impressions) / len(all_impressions),
+        'abnormal': total - normal_count,
+        'conditions': condition_counts.most_common(5),
+        'anatomy': anatomy_counts.most_common(5),
+        'status': status_counts.most_common(5),
+        'avg_finding_len': finding_words / total,
+        'avg_impression_len': impression_words / total,
     }
 
 
 def analyze_health_questions(samples):
     """Analyze health questions for insights"""
-    all_questions = []
-    all_summaries = []
-    topics = []
+    total = 0
+    question_words = 0
+    summary_words = 0
+    topic_counts = Counter()
     
     for sample in samples:
-        question = sample.get('inputs', '')
-        summary = sample.get('target', '')
+        question = sample.inputs
+        summary = sample.target
         
-        all_questions.append(question)
-        all_summaries.append(summary)
+        total += 1
+        question_words += len(question.split())
+        summary_words += len(summary.split())
         
-        # Extract topics (simple keyword extraction)
-        question_lower = question.lower()
-        if any(word in question_lower for word in ['medication', 'drug', 'pill', 'prescription']):
-            topics.append('Medication')
-        if any(word in question_lower for word in ['pain', 'hurt', 'ache']):
-            topics.append('Pain')
-        if any(word in question_lower for word in ['treatment', 'therapy', 'cure']):
-            topics.append('Treatment')
-        if any(word in question_lower for word in ['side effect', 'adverse', 'reaction']):
-            topics.append('Side Effects')
-        if any(word in question_lower for word in ['test', 'diagnosis', 'screen']):
-            topics.append('Diagnosis')
-    
-    topic_freq = Counter(topics).most_common(5)
+        # Extract topics (simple keyword extraction), each counted once per question
+        matched = {m.lastgroup for m in _TOPIC_RE.finditer(question)}
+        topic_counts.update(label for group, label in _TOPIC_LABELS if group in matched)
     
     return {
-        'total': len(samples),
-        'topics': topic_freq,
-        'avg_question_len': sum(len(q.split()) for q in all_questions) / len(all_questions),
-        'avg_summary_len': sum(len(s.split()) for s in all_summaries) / len(all_summaries),
+        'total': total,
+        'topics': topic_counts.most_common(5),
+        'avg_question_len': question_words / total,
+        'avg_summary_len': summary_words / total,
     }
 
 
 def print_with_rich(data_dir, dataset_code, dataset_name):
     """Print beautiful dashboard with rich library"""
+    from rich import box
+    from rich.console import Group
+    from rich.panel import Panel
+    from rich.table import Table
+    
     # Load data
     test_file = data_dir / dataset_code / "test.jsonl"
-    with open(test_file, 'r', encoding='utf-8') as f:
-        samples = [json.loads(line) for line in f]
+    preview, samples = load_samples(test_file, 3)
     
-    # Clear screen
-    console.clear()
+    # Collect everything and render it with a single console.print
+    renderables = []
     
     # Title
-    console.print("\n")
-    console.print(Panel.fit(
+    renderables.append("\n")
+    renderables.append(Panel.fit(
         f"[bold cyan]Clinical Text Summarization Dashboard[/bold cyan]\n"
         f"[yellow]{dataset_name}[/yellow]",
         border_style="cyan"
@@ -167,8 +219,8 @@ def print_with_rich(data_dir, dataset_code, dataset_name):
         table.add_row("Avg Impression Length", f"{stats['avg_impression_len']:.1f} words")
         table.add_row("Compression Ratio", f"{stats['avg_finding_len']/stats['avg_impression_len']:.1f}x")
         
-        console.print(table)
-        console.print()
+        renderables.append(table)
+        renderables.append("")
         
         # Top conditions
         if stats['conditions']:
@@ -177,12 +229,12 @@ def print_with_rich(data_dir, dataset_code, dataset_name):
             table2.add_column("Count", style="green", justify="right")
             table2.add_column("Percentage", style="cyan", justify="right")
             
-            for condition, count in stats['conditions'][:5]:
+            for condition, count in stats['conditions']:
                 pct = (count / stats['total']) * 100
                 table2.add_row(condition.title(), str(count), f"{pct:.1f}%")
             
-            console.print(table2)
-            console.print()
+            renderables.append(table2)
+            renderables.append("")
         
         # Anatomy
         if stats['anatomy']:
@@ -190,11 +242,11 @@ def print_with_rich(data_dir, dataset_code, dataset_name):
             table3.add_column("Body Part", style="yellow")
             table3.add_column("Mentions", style="green", justify="right")
             
-            for anatomy, count in stats['anatomy'][:5]:
+            for anatomy, count in stats['anatomy']:
                 table3.add_row(anatomy.title(), str(count))
             
-            console.print(table3)
-            console.print()
+            renderables.append(table3)
+            renderables.append("")
     
     elif dataset_code == 'chq':
         stats = analyze_health_questions(samples)
@@ -208,8 +260,8 @@ def print_with_rich(data_dir, dataset_code, dataset_name):
         table.add_row("Avg Summary Length", f"{stats['avg_summary_len']:.1f} words")
         table.add_row("Compression Ratio", f"{stats['avg_question_len']/stats['avg_summary_len']:.1f}x")
         
-        console.print(table)
-        console.print()
+        renderables.append(table)
+        renderables.append("")
         
         # Topics
         if stats['topics']:
@@ -222,26 +274,30 @@ def print_with_rich(data_dir, dataset_code, dataset_name):
                 pct = (count / stats['total']) * 100
                 table2.add_row(topic, str(count), f"{pct:.1f}%")
             
-            console.print(table2)
-            console.print()
+            renderables.append(table2)
+            renderables.append("")
     
     # Sample reports
-    console.print(Panel("[bold]Sample Reports[/bold]", style="magenta"))
+    renderables.append(Panel("[bold]Sample Reports[/bold]", style="magenta"))
     
-    for i, sample in enumerate(samples[:3], 1):
-        console.print(f"\n[bold cyan]Sample #{i}[/bold cyan]")
-        console.print(Panel(
-            f"[yellow]Input:[/yellow]\n{sample.get('inputs', 'N/A')[:200]}...\n\n"
-            f"[green]Summary:[/green]\n{sample.get('target', 'N/A')}",
+    for i, sample in enumerate(preview, 1):
+        renderables.append(f"\n[bold cyan]Sample #{i}[/bold cyan]")
+        renderables.append(Panel(
+            f"[yellow]Input:[/yellow]\n{(sample.inputs or 'N/A')[:200]}...\n\n"
+            f"[green]Summary:[/green]\n{sample.target or 'N/A'}",
             border_style="blue"
         ))
+    
+    # Clear screen and render the whole dashboard at once
+    console = get_console()
+    console.clear()
+    console.print(Group(*renderables))
 
 
 def print_simple(data_dir, dataset_code, dataset_name):
     """Print simple dashboard without rich library"""
     test_file = data_dir / dataset_code / "test.jsonl"
-    with open(test_file, 'r', encoding='utf-8') as f:
-        samples = [json.loads(line) for line in f]
+    preview, samples = load_samples(test_file, 3)
     
     print("\n" + "="*70)
     print(f"  CLINICAL TEXT SUMMARIZATION DASHBOARD")
@@ -264,7 +320,7 @@ def print_simple(data_dir, dataset_code, dataset_name):
         if stats['conditions']:
             print("🏥 MOST COMMON CONDITIONS")
             print("-" * 70)
-            for i, (condition, count) in enumerate(stats['conditions'][:5], 1):
+            for i, (condition, count) in enumerate(stats['conditions'], 1):
                 pct = (count / stats['total']) * 100
                 print(f"  {i}. {condition.title():.<40} {count:>3} ({pct:.1f}%)")
             print()
@@ -272,7 +328,7 @@ def print_simple(data_dir, dataset_code, dataset_name):
         if stats['anatomy']:
             print("🫁 MOST REFERENCED ANATOMY")
             print("-" * 70)
-            for i, (anatomy, count) in enumerate(stats['anatomy'][:5], 1):
+            for i, (anatomy, count) in enumerate(stats['anatomy'], 1):
                 print(f"  {i}. {anatomy.title():.<40} {count:>3}")
             print()
     
@@ -298,11 +354,11 @@ def print_simple(data_dir, dataset_code, dataset_name):
     print("📄 SAMPLE REPORTS")
     print("=" * 70)
     
-    for i, sample in enumerate(samples[:3], 1):
+    for i, sample in enumerate(preview, 1):
         print(f"\n  Sample #{i}")
         print("  " + "-" * 68)
-        print(f"  INPUT: {sample.get('inputs', 'N/A')[:150]}...")
-        print(f"  SUMMARY: {sample.get('target', 'N/A')}")
+        print(f"  INPUT: {(sample.inputs or 'N/A')[:150]}...")
+        print(f"  SUMMARY: {sample.target or 'N/A'}")
         print()
 
 
@@ -315,7 +371,15 @@ def main():
         '3': ('d2n', 'Doctor-Patient Dialogues')
     }
     
-    if HAS_RICH:
+    use_rich = HAS_RICH
+    if use_rich:
+        # rich may be installed but fail to import; fall back to plain output
+        try:
+            console = get_console()
+        except ImportError:
+            use_rich = False
+    
+    if use_rich:
         console.print("\n[bold cyan]Clinical Text Summarization - Interactive Dashboard[/bold cyan]\n")
         console.print("Available datasets:")
         for key, (code, name) in datasets.items():
@@ -341,8 +405,11 @@ def main():
         print(f"\nError: {test_file} not found!")
         return
     
-    if HAS_RICH:
-        print_with_rich(data_dir, dataset_code, dataset_name)
+    if use_rich:
+        try:
+            print_with_rich(data_dir, dataset_code, dataset_name)
+        except ImportError:
+            print_simple(data_dir, dataset_code, dataset_name)
     else:
         print_simple(data_dir, dataset_code, dataset_name)
     
@@ -0,0 +1,69 @@
+"""
+Shared helpers for reading the jsonl data and result files
+"""
+import mmap
+import os
+from collections import namedtuple
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Decode records straight into a typed struct when msgspec is available
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+
+if HAS_MSGSPEC:
+    class Sample(msgspec.Struct):
+        """Input and summary text of a test.jsonl record; some files name the input 'input'"""
+        inputs: str = ''
+        input: str = ''
+        target: str = ''
+
+    class ResultPair(msgspec.Struct):
+        """Reference and model output of a result.jsonl record"""
+        target: str
+        output: str
+
+    decode_sample = msgspec.json.Decoder(Sample).decode
+    _result_decoder = msgspec.json.Decoder(ResultPair)
+
+    def decode_pair(line):
+        """Decode one result.jsonl line into a (reference, prediction) pair"""
+        result = _result_decoder.decode(line)
+        return result.target, result.output
+else:
+    Sample = namedtuple('Sample', ['inputs', 'input', 'target'])
+
+    def decode_sample(line):
+        """Decode one test.jsonl line into a Sample"""
+        record = json_loads(line)
+        return Sample(record.get('inputs', ''), record.get('input', ''), record.get('target', ''))
+
+    def decode_pair(line):
+        """Decode one result.jsonl line into a (reference, prediction) pair"""
+        record = json_loads(line)
+        return record['target'], record['output']
+
+
+def iter_jsonl(path, decode):
+    """Yield decode(line) for each non-blank line of a jsonl file, read through a memory map"""
+    with open(path, 'rb') as f:
+        # mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = 0, len(mm)
+            while start < end:
+                nl = mm.find(b'\n', start)
+                if nl < 0:
+                    nl = end
+                line = mm[start:nl]
+                start = nl + 1
+                if line.strip():
+                    yield decode(line)
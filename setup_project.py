@@ -3,6 +3,19 @@ Quick setup script to configure the project directory
 """
 import os
 import shutil
+from pathlib import Path
+
+def copy_data(data_src, data_dst):
+    """Hard-link the data files when both sides share a filesystem, otherwise copy them"""
+    dst_parent = os.path.dirname(os.path.abspath(data_dst))
+    if os.stat(data_src).st_dev == os.stat(dst_parent).st_dev:
+        try:
+            shutil.copytree(data_src, data_dst, copy_function=os.link)
+            return
+        except OSError:
+            # Filesystem refused the links, fall back to a full copy
+            shutil.rmtree(data_dst, ignore_errors=True)
+    shutil.copytree(data_src, data_dst)
 
 def setup_project():
     print("=" * 60)
@@ -39,26 +52,23 @@ def setup_project():
     
     if os.path.exists(data_src) and not os.path.exists(data_dst):
         print(f"\n✓ Copying data from {data_src} to {data_dst}...")
-        shutil.copytree(data_src, data_dst)
+        copy_data(data_src, data_dst)
         print("  Data copied successfully!")
     elif os.path.exists(data_dst):
         print(f"\n✓ Data already exists at {data_dst}")
     
     # Update constants.py
-    constants_file = os.path.join(current_dir, "src", "constants.py")
+    constants_file = Path(current_dir, "src", "constants.py")
     
-    with open(constants_file, 'r') as f:
-        content = f.read()
+    # Work on raw bytes, no need to decode and re-encode the whole file
+    content = constants_file.read_bytes()
     
     # Replace the DIR_PROJECT line
-    old_line = 'DIR_PROJECT = "/your/project/directory/here/"'
-    new_line = f'DIR_PROJECT = r"{project_dir}"'
+    old_line = b'DIR_PROJECT = "/your/project/directory/here/"'
+    new_line = f'DIR_PROJECT = r"{project_dir}"'.encode('utf-8')
     
     if old_line in content:
-        content = content.replace(old_line, new_line)
-        
-        with open(constants_file, 'w') as f:
-            f.write(content)
+        constants_file.write_bytes(content.replace(old_line, new_line))
         
         print(f"\n✓ Updated src/constants.py with project directory")
     else:
@@ -3,34 +3,123 @@ Simple script to calculate metrics on pre-existing result files
 in the data directory (not requiring model generation)
 """
 
-import json
+import argparse
+import contextlib
+import functools
+import math
 import os
 import sys
-from evaluate import load
-from bert_score import score as bert_score_fn
-from rouge_score import rouge_scorer
-import nltk
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-# Download NLTK data if needed
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from jsonl_io import decode_pair, iter_jsonl
 
-def calculate_metrics_from_file(result_file):
-    """Calculate metrics from a result.jsonl file"""
+# evaluate, bert_score, rouge_score, nltk and torch are slow to import, so
+# they are imported inside the functions that use them
+
+# Number of pairs handed to BLEU / BERTScore at a time
+BATCH_SIZE = 64
+
+# Number of pairs scored by each ROUGE worker task
+ROUGE_BATCH_SIZE = 256
+
+ROUGE_TYPES = ['rouge1', 'rouge2', 'rougeL']
+
+def ensure_nltk_data():
+    """Download NLTK data if needed"""
+    import nltk
+    
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+
+class CachedStemTokenizer:
+    """ROUGE's default stemming tokenizer with the Porter stemmer memoized per word"""
+    
+    def __init__(self, maxsize=100_000):
+        from nltk.stem import porter
+        from rouge_score import tokenize as rouge_tokenize
+        
+        self._tokenize = rouge_tokenize.tokenize
+        self.stem = functools.lru_cache(maxsize=maxsize)(porter.PorterStemmer().stem)
+    
+    def tokenize(self, text):
+        return self._tokenize(text, self)
+
+def iter_pairs(result_file):
+    """Return an iterator of (reference, prediction) pairs from a result.jsonl file"""
+    return iter_jsonl(result_file, decode_pair)
+
+def iter_batches(pairs, batch_size=BATCH_SIZE):
+    """Group pairs into (references, predictions) lists of at most batch_size"""
+    pairs = iter(pairs)
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return
+        references, predictions = zip(*batch)
+        yield list(references), list(predictions)
+
+@functools.lru_cache(maxsize=None)
+def get_rouge_scorer():
+    """Return this process's ROUGE scorer, built once so its stem cache is shared"""
+    from rouge_score import rouge_scorer
+    
+    return rouge_scorer.RougeScorer(ROUGE_TYPES, tokenizer=CachedStemTokenizer())
+
+@functools.lru_cache(maxsize=None)
+def get_bert_scorer(quantize_cpu=False):
+    """Return a BERTScorer loaded once, on the GPU when one is available
+    
+    With quantize_cpu and no GPU, the model's linear layers run as dynamic int8.
+    This is faster but the scores drift from the fp32 model the rescaling
+    baseline was computed for, so it is opt-in.
+    """
+    import torch
+    from bert_score import BERTScorer
+    
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    scorer = BERTScorer(lang='en', rescale_with_baseline=True, device=device, batch_size=BATCH_SIZE)
+    if device == 'cpu' and quantize_cpu:
+        scorer._model = torch.ao.quantization.quantize_dynamic(
+            scorer._model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return scorer
+
+def score_rouge_batch(batch):
+    """Return the summed ROUGE f-measures and pair count for one batch"""
+    references, predictions = batch
+    scorer = get_rouge_scorer()
+    totals = dict.fromkeys(ROUGE_TYPES, 0.0)
+    for ref, pred in zip(references, predictions):
+        scores = scorer.score(ref, pred)
+        for rouge_type in ROUGE_TYPES:
+            totals[rouge_type] += scores[rouge_type].fmeasure
+    return totals, len(references)
+
+def map_bounded(executor, fn, iterable, max_pending):
+    """Like executor.map, but only keeps max_pending tasks queued at a time"""
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def calculate_metrics_from_file(result_file, quantize_cpu=False):
+    """Calculate metrics from a result.jsonl file, streaming it once per metric"""
     
     print(f"\nLoading results from: {result_file}")
     
-    # Load data
-    with open(result_file, 'r', encoding='utf-8') as f:
-        data = [json.loads(line) for line in f]
+    with open(result_file, 'rb') as f:
+        num_samples = sum(1 for line in f if line.strip())
     
-    print(f"Found {len(data)} samples")
+    print(f"Found {num_samples} samples")
     
-    # Extract references and predictions
-    references = [item['target'] for item in data]
-    predictions = [item['output'] for item in data]
+    ensure_nltk_data()
     
     print("\nCalculating metrics...")
     metrics = {}
@@ -38,8 +127,11 @@ def calculate_metrics_from_file(result_file):
     # 1. BLEU Score
     try:
         print("  - Calculating BLEU...")
+        from evaluate import load
         bleu = load("bleu")
-        bleu_results = bleu.compute(predictions=predictions, references=references)
+        for references, predictions in iter_batches(iter_pairs(result_file)):
+            bleu.add_batch(predictions=predictions, references=references)
+        bleu_results = bleu.compute()
         metrics['BLEU'] = bleu_results['bleu']
         print(f"    BLEU: {metrics['BLEU']:.4f}")
     except Exception as e:
@@ -48,18 +140,30 @@ def calculate_metrics_from_file(result_file):
     # 2. ROUGE Scores
     try:
         print("  - Calculating ROUGE...")
-        scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-        rouge_scores = {'rouge1': [], 'rouge2': [], 'rougeL': []}
+        rouge_totals = dict.fromkeys(ROUGE_TYPES, 0.0)
+        num_scored = 0
+        
+        # Pairs are independent, so batches are scored across the cores, with
+        # no more workers than batches and no pool at all for a single batch
+        batches = iter_batches(iter_pairs(result_file), ROUGE_BATCH_SIZE)
+        num_batches = math.ceil(num_samples / ROUGE_BATCH_SIZE)
+        num_workers = min(os.cpu_count() or 1, num_batches)
+        executor = ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
         
-        for ref, pred in zip(references, predictions):
-            scores = scorer.score(ref, pred)
-            rouge_scores['rouge1'].append(scores['rouge1'].fmeasure)
-            rouge_scores['rouge2'].append(scores['rouge2'].fmeasure)
-            rouge_scores['rougeL'].append(scores['rougeL'].fmeasure)
+        with executor or contextlib.nullcontext():
+            if executor:
+                batch_results = map_bounded(executor, score_rouge_batch, batches, 2 * num_workers)
+            else:
+                batch_results = map(score_rouge_batch, batches)
+            
+            for totals, count in batch_results:
+                for rouge_type in ROUGE_TYPES:
+                    rouge_totals[rouge_type] += totals[rouge_type]
+                num_scored += count
         
-        metrics['ROUGE-1'] = sum(rouge_scores['rouge1']) / len(rouge_scores['rouge1'])
-        metrics['ROUGE-2'] = sum(rouge_scores['rouge2']) / len(rouge_scores['rouge2'])
-        metrics['ROUGE-L'] = sum(rouge_scores['rougeL']) / len(rouge_scores['rougeL'])
+        metrics['ROUGE-1'] = rouge_totals['rouge1'] / num_scored
+        metrics['ROUGE-2'] = rouge_totals['rouge2'] / num_scored
+        metrics['ROUGE-L'] = rouge_totals['rougeL'] / num_scored
         
         print(f"    ROUGE-1: {metrics['ROUGE-1']:.4f}")
         print(f"    ROUGE-2: {metrics['ROUGE-2']:.4f}")
@@ -70,25 +174,39 @@ def calculate_metrics_from_file(result_file):
     # 3. BERTScore
     try:
         print("  - Calculating BERTScore (this may take a minute)...")
-        P, R, F1 = bert_score_fn(predictions, references, lang='en', rescale_with_baseline=True)
-        metrics['BERTScore'] = F1.mean().item()
-        print(f"    BERTScore: {metrics['BERTScore']:.4f}")
+        bert_scorer = get_bert_scorer(quantize_cpu)
+        quantized = quantize_cpu and bert_scorer.device == 'cpu'
+        if quantized:
+            print("    Using an int8-quantized model on CPU, scores differ slightly from fp32")
+        f1_total = 0.0
+        num_scored = 0
+        
+        for references, predictions in iter_batches(iter_pairs(result_file)):
+            P, R, F1 = bert_scorer.score(predictions, references, batch_size=bert_scorer.batch_size)
+            f1_total += F1.sum().item()
+            num_scored += len(predictions)
+        
+        metrics['BERTScore'] = f1_total / num_scored
+        print(f"    BERTScore: {metrics['BERTScore']:.4f}" + (" (int8-quantized)" if quantized else ""))
     except Exception as e:
         print(f"    BERTScore calculation failed: {e}")
     
     return metrics
 
 def main():
-    # Check for command line argument
-    if len(sys.argv) > 1:
-        result_file = sys.argv[1]
-    else:
-        # Default to the opi result file
-        result_file = r"C:\Users\sneha\clin-summ-data\data\opi\result.jsonl"
+    arg_parser = argparse.ArgumentParser(description="Calculate metrics on an existing result.jsonl file")
+    # Default to the opi result file
+    arg_parser.add_argument('result_file', nargs='?',
+                            default=r"C:\Users\sneha\clin-summ-data\data\opi\result.jsonl")
+    arg_parser.add_argument('--quantize-cpu', action='store_true',
+                            help="without a GPU, run BERTScore on an int8-quantized model "
+                                 "(faster, but scores differ slightly from the fp32 model)")
+    args = arg_parser.parse_args()
+    result_file = args.result_file
     
     if not os.path.exists(result_file):
         print(f"Error: File not found: {result_file}")
-        print(f"\nUsage: python {sys.argv[0]} <path_to_result.jsonl>")
+        print(f"\nUsage: python {sys.argv[0]} [--quantize-cpu] <path_to_result.jsonl>")
         print(f"\nAvailable result files:")
         data_dir = r"C:\Users\sneha\clin-summ-data\data"
         for dataset in ['opi', 'chq', 'd2n']:
@@ -98,7 +216,7 @@ def main():
         return
     
     # Calculate metrics
-    metrics = calculate_metrics_from_file(result_file)
+    metrics = calculate_metrics_from_file(result_file, quantize_cpu=args.quantize_cpu)
     
     # Print summary
     print("\n" + "="*60)
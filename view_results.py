@@ -1,11 +1,57 @@
 """
 Simple script to view clinical text summarization results
 """
-import json
+import argparse
 import os
 from pathlib import Path
 
+from jsonl_io import decode_sample, iter_jsonl
+
+def print_opi_sample(input_text, target_text):
+    """Print a radiology findings / impression pair"""
+    print(f"\n📋 RADIOLOGY FINDINGS (Input):")
+    print(f"{input_text[:400]}")
+    if len(input_text) > 400:
+        print("...")
+    print(f"\n💡 IMPRESSION (Summary):")
+    print(f"{target_text}")
+
+
+def print_d2n_sample(input_text, target_text):
+    """Print a dialogue / assessment and plan pair, truncating long text"""
+    print(f"\n💬 DOCTOR-PATIENT DIALOGUE (Input):")
+    print(f"{input_text[:400]}")
+    if len(input_text) > 400:
+        print("...")
+    print(f"\n📝 ASSESSMENT & PLAN (Summary):")
+    if len(target_text) > 300:
+        print(f"{target_text[:300]}...")
+    else:
+        print(f"{target_text}")
+
+
+def print_chq_sample(input_text, target_text):
+    """Print a patient question and its summarized question"""
+    print(f"\n❓ PATIENT QUESTION (Input):")
+    print(f"{input_text}")
+    print(f"\n✅ SUMMARIZED QUESTION:")
+    print(f"{target_text}")
+
+
+# Sample printer for each dataset, picked once before the display loop
+SAMPLE_PRINTERS = {
+    'opi': print_opi_sample,
+    'd2n': print_d2n_sample,
+    'chq': print_chq_sample,
+}
+
+
 def main():
+    arg_parser = argparse.ArgumentParser(description="View clinical text summarization samples")
+    arg_parser.add_argument('--preview-only', action='store_true',
+                            help="only read the samples that are shown and skip the statistics")
+    args = arg_parser.parse_args()
+    
     # Path to the data
     data_dir = Path("C:/Users/sneha/clin-summ-data/data")
     
@@ -42,66 +88,52 @@ def main():
     print(f"Dataset: {dataset_name}")
     print(f"{'=' * 70}\n")
     
-    # Read and display samples
-    with open(test_file, 'r', encoding='utf-8') as f:
-        samples = [json.loads(line) for line in f]
-    
-    print(f"Total samples: {len(samples)}\n")
-    
-    num_to_show = min(5, len(samples))
+    # Stream the samples once, keeping running totals and the first few for display
+    samples = []
+    num_samples = 0
+    total_input_words = 0
+    total_target_words = 0
+    for sample in iter_jsonl(test_file, decode_sample):
+        if len(samples) < 5:
+            samples.append(sample)
+        elif args.preview_only:
+            break
+        num_samples += 1
+        total_input_words += len((sample.inputs or sample.input).split())
+        total_target_words += len(sample.target.split())
+    
+    if not args.preview_only:
+        print(f"Total samples: {num_samples}\n")
+    
+    num_to_show = len(samples)
     print(f"Showing first {num_to_show} samples:\n")
     
-    for i, sample in enumerate(samples[:num_to_show], 1):
+    # Display based on dataset type
+    print_sample = SAMPLE_PRINTERS[dataset_code]
+    
+    for i, sample in enumerate(samples, 1):
         print(f"\n{'─' * 70}")
         print(f"Sample #{i}")
         print(f"{'─' * 70}")
         
-        # Display based on dataset type
-        input_text = sample.get('inputs', sample.get('input', 'N/A'))
-        target_text = sample.get('target', 'N/A')
-        
-        if dataset_code == 'opi':
-            print(f"\n📋 RADIOLOGY FINDINGS (Input):")
-            print(f"{input_text[:400]}")
-            if len(input_text) > 400:
-                print("...")
-            print(f"\n💡 IMPRESSION (Summary):")
-            print(f"{target_text}")
-            
-        elif dataset_code == 'd2n':
-            print(f"\n💬 DOCTOR-PATIENT DIALOGUE (Input):")
-            print(f"{input_text[:400]}")
-            if len(input_text) > 400:
-                print("...")
-            print(f"\n📝 ASSESSMENT & PLAN (Summary):")
-            if len(target_text) > 300:
-                print(f"{target_text[:300]}...")
-            else:
-                print(f"{target_text}")
-            
-        elif dataset_code == 'chq':
-            print(f"\n❓ PATIENT QUESTION (Input):")
-            print(f"{input_text}")
-            print(f"\n✅ SUMMARIZED QUESTION:")
-            print(f"{target_text}")
+        input_text = sample.inputs or sample.input or 'N/A'
+        target_text = sample.target or 'N/A'
+        print_sample(input_text, target_text)
     
     # Show basic statistics
-    print(f"\n\n{'=' * 70}")
-    print("Basic Statistics")
-    print(f"{'=' * 70}")
-    
-    # Calculate average lengths using 'inputs' and 'target' keys
-    input_lengths = [len(s.get('inputs', s.get('input', '')).split()) for s in samples]
-    target_lengths = [len(s.get('target', '').split()) for s in samples]
-    
-    print(f"\nTotal Samples: {len(samples)}")
-    print(f"Average Input Length: {sum(input_lengths)/len(input_lengths):.1f} words")
-    print(f"Average Summary Length: {sum(target_lengths)/len(target_lengths):.1f} words")
-    
-    if sum(target_lengths) > 0:
-        print(f"Compression Ratio: {sum(input_lengths)/sum(target_lengths):.1f}x")
-    else:
-        print(f"Compression Ratio: N/A")
+    if not args.preview_only:
+        print(f"\n\n{'=' * 70}")
+        print("Basic Statistics")
+        print(f"{'=' * 70}")
+        
+        print(f"\nTotal Samples: {num_samples}")
+        print(f"Average Input Length: {total_input_words/num_samples:.1f} words")
+        print(f"Average Summary Length: {total_target_words/num_samples:.1f} words")
+        
+        if total_target_words > 0:
+            print(f"Compression Ratio: {total_input_words/total_target_words:.1f}x")
+        else:
+            print(f"Compression Ratio: N/A")
     
     print("\n" + "=" * 70)
     print("Done!")